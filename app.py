@@ -1,11 +1,29 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request
 from flask_cors import CORS
 import pandas as pd
 import joblib
 import os
 import logging
+import json
 import numpy as np
 import xgboost as xgb
+import orjson
+import sklearn
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+import functools
+import queue
+import threading
+import time
+
+# Cache compiled Numba kernels next to the model artifacts
+os.environ.setdefault(
+    'NUMBA_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model', '__numba_cache__')
+)
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; encoding falls back to vectorized NumPy
+    njit = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -15,209 +33,763 @@ app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend integration
 
 # Global variables for model and preprocessor
-model = None
+booster = None
 preprocessor = None
+feature_encoder = None
+# Column order and dtypes for the preprocessor.transform fallback path
+input_columns = None
+input_dtypes = None
+# Width of the model input, checked against the feature encoder at load time
+n_model_features = None
+# Trees used at predict time; (0, 0) means all of them
+iteration_range = (0, 0)
+# Flattened trees for the Numba traversal kernel (None: use booster.inplace_predict)
+tree_model = None
+USE_TREE_KERNEL = os.environ.get('USE_TREE_KERNEL', '1') == '1'
+# Beyond this many rows XGBoost's blocked predictor is faster than the kernel
+TREE_KERNEL_MAX_ROWS = 64
+
+# Micro-batching settings: a lone /predict request is scored immediately; when
+# requests are already queued, those arriving within BATCH_TIMEOUT_MS are
+# scored together (up to MAX_BATCH rows)
+MAX_BATCH = int(os.environ.get('MAX_BATCH', 64))
+if MAX_BATCH < 1:
+    # The batch worker's preallocated buffers hold MAX_BATCH rows
+    raise ValueError(f"MAX_BATCH must be at least 1, got {MAX_BATCH}")
+BATCH_TIMEOUT_MS = float(os.environ.get('BATCH_TIMEOUT_MS', 5))
+# How long a queued request may take to be scored once its batch window closes
+SCORING_TIMEOUT_MS = float(os.environ.get('SCORING_TIMEOUT_MS', 2000))
+
+# Number of distinct applicant feature sets whose probability is memoized
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 4096))
+
+batch_queue = queue.Queue()
+batch_worker = None
+# PID of the process that started batch_worker; threads don't survive fork()
+batch_worker_pid = None
+batch_worker_lock = threading.Lock()
 
 def load_models():
     """Load the trained model and preprocessor"""
-    global model, preprocessor
+    global booster, preprocessor, feature_encoder, input_columns, input_dtypes, n_model_features, iteration_range, tree_model
     
     try:
         # Resolve model directory relative to this file
         base_dir = os.path.dirname(os.path.abspath(__file__))
         model_dir = os.path.join(base_dir, "model")
 
-        # Load the preprocessor
+        # Load the preprocessing parameters
+        encoder_path = os.path.join(model_dir, "pre.npz")
         preprocessor_path = os.path.join(model_dir, "preprocessor.joblib")
-        if os.path.exists(preprocessor_path):
-            preprocessor = joblib.load(preprocessor_path)
+        preprocessor = None
+        feature_encoder = None
+        input_columns = None
+        input_dtypes = None
+        if os.path.exists(encoder_path):
+            # Plain arrays: nothing to unpickle and no dependency on the training sklearn version
+            feature_encoder = load_feature_encoder(encoder_path)
+            logger.info("Preprocessing parameters loaded successfully")
+        elif os.path.exists(preprocessor_path):
+            # Memory-map the fitted NumPy arrays read-only instead of copying them to the heap
+            preprocessor = joblib.load(preprocessor_path, mmap_mode='r')
             logger.info("Preprocessor loaded successfully")
+            # Precompute the transform so requests skip pandas/ColumnTransformer
+            try:
+                feature_encoder = build_feature_encoder(preprocessor)
+            except Exception as e:
+                logger.warning(f"Could not build feature encoder, using preprocessor.transform: {e}")
+            # Fix column order and dtypes up front so the DataFrame fallback skips dtype inference
+            input_columns = list(getattr(preprocessor, 'feature_names_in_', [])) or None
+            schema_path = os.path.join(model_dir, "input_schema.json")
+            if os.path.exists(schema_path):
+                with open(schema_path) as f:
+                    schema = json.load(f)
+                input_dtypes = {
+                    **{col: np.float64 for col in schema['numerical']},
+                    **{col: 'category' for col in schema['categorical']}
+                }
         else:
             logger.error(f"Preprocessor file not found at {preprocessor_path}")
             return False
+
+        if feature_encoder is not None:
+            # Compile (or load the cached) encoding kernel before the first request
+            _encode_arrays(
+                np.zeros((1, len(feature_encoder['num_cols']))),
+                np.full((1, len(feature_encoder['cat_cols'])), -1, dtype=np.intp)
+            )
+            logger.info(f"Feature encoder built ({feature_encoder['n_features']} features, "
+                        f"numba={'on' if encode_kernel is not None else 'off'})")
             
-        # Load the XGBoost model
-        model_path = os.path.join(model_dir, "final_xgb_model.joblib")
+        # Load the raw XGBoost Booster (UBJSON is portable across XGBoost versions)
+        model_path = os.path.join(model_dir, "xgb.ubj")
+        legacy_model_path = os.path.join(model_dir, "final_xgb_model.joblib")
         if os.path.exists(model_path):
-            model = joblib.load(model_path)
+            booster = xgb.Booster()
+            booster.load_model(model_path)
             logger.info("XGBoost model loaded successfully")
-            # Compatibility hotfix for models serialized with older XGBoost
-            if not hasattr(model, 'use_label_encoder'):
-                try:
-                    setattr(model, 'use_label_encoder', False)
-                    logger.info("Applied compatibility fix: set model.use_label_encoder = False")
-                except Exception:
-                    logger.warning("Could not set model.use_label_encoder; proceeding without it")
-            # Force CPU prediction to avoid missing GPU attributes
-            try:
-                if hasattr(model, 'set_params'):
-                    model.set_params(**{
-                        'predictor': 'cpu_predictor',
-                        'tree_method': 'hist',
-                        'device': 'cpu',
-                        'n_jobs': 1
-                    })
-                # Ensure attributes exist on the sklearn wrapper
-                if not hasattr(model, 'gpu_id'):
-                    setattr(model, 'gpu_id', -1)
-                if not hasattr(model, 'device'):
-                    setattr(model, 'device', 'cpu')
-                # Also set params on the underlying Booster if present
-                if hasattr(model, 'get_booster'):
-                    try:
-                        booster = model.get_booster()
-                        booster.set_param({'predictor': 'cpu_predictor', 'device': 'cpu'})
-                    except Exception:
-                        pass
-                logger.info("Applied CPU predictor compatibility settings")
-            except Exception as e:
-                logger.warning(f"Could not enforce CPU predictor settings: {e}")
+        elif os.path.exists(legacy_model_path):
+            # Older training runs only saved the pickled XGBClassifier
+            booster = joblib.load(legacy_model_path).get_booster()
+            logger.warning("Loaded legacy final_xgb_model.joblib; retrain to produce model/xgb.ubj")
         else:
             logger.error(f"Model file not found at {model_path}")
             return False
+
+        # The encoding kernel writes unchecked into buffers of the Booster's width,
+        # so a stale pre.npz/model pair must not be served
+        n_model_features = booster.num_features()
+        if feature_encoder is not None and feature_encoder['n_features'] != n_model_features:
+            logger.error(f"Feature encoder produces {feature_encoder['n_features']} features, "
+                         f"model expects {n_model_features}; retrain to regenerate both artifacts")
+            return False
+
+        # Single-threaded CPU prediction: an OpenMP thread team only adds
+        # latency jitter for the handful of rows scored per call
+        booster.set_param({'nthread': 1, 'predictor': 'cpu_predictor', 'device': 'cpu'})
+
+        # Only evaluate trees up to the early-stopping optimum recorded at training
+        best_iteration = booster.attr('best_iteration')
+        if best_iteration is not None:
+            iteration_range = (0, int(best_iteration) + 1)
+            logger.info(f"Predicting with {iteration_range[1]} of {booster.num_boosted_rounds()} boosting rounds")
+        else:
+            iteration_range = (0, 0)
+
+        # Score with the flattened-tree kernel when it reproduces XGBoost's output
+        tree_model = None
+        if tree_kernel is not None and USE_TREE_KERNEL:
+            try:
+                tree_model = build_tree_model(booster, iteration_range)
+                logger.info(f"Tree kernel enabled ({len(tree_model['roots'])} trees, depth {tree_model['depth']})")
+            except Exception as e:
+                logger.warning(f"Tree kernel disabled, using booster.inplace_predict: {e}")
             
+        # Warm-up prediction so the first request doesn't pay for lazy initialisation
+        try:
+            _predict_proba(np.zeros((1, n_model_features), dtype=np.float32))
+            logger.info("Warm-up prediction completed")
+        except Exception as e:
+            logger.warning(f"Warm-up prediction failed: {e}")
+
+        # The batch thread is started by the process that serves requests (see
+        # start_batch_worker), never here: a preloading server would fork it away
+        _cached_probability.cache_clear()
         return True
         
     except Exception as e:
         logger.error(f"Error loading models: {str(e)}")
         return False
 
+def build_feature_encoder(preprocessor):
+    """Precompute scaler statistics and one-hot slots of a fitted ColumnTransformer"""
+    num_cols, num_slots, means, scales = [], [], [], []
+    cat_cols, cat_lookup, cat_strict = [], [], []
+    offset = 0
+    for name, transformer, columns in preprocessor.transformers_:
+        if isinstance(transformer, str) and transformer == 'drop':
+            continue
+        if isinstance(transformer, StandardScaler):
+            n = len(columns)
+            mean = transformer.mean_ if transformer.mean_ is not None else np.zeros(n)
+            scale = transformer.scale_ if transformer.scale_ is not None else np.ones(n)
+            num_cols.extend(columns)
+            num_slots.extend(range(offset, offset + n))
+            means.extend(mean)
+            scales.extend(scale)
+            offset += n
+        elif isinstance(transformer, OneHotEncoder):
+            if transformer.drop_idx_ is not None or getattr(transformer, '_infrequent_enabled', False):
+                raise ValueError(f"Unsupported OneHotEncoder options in '{name}'")
+            for col, categories in zip(columns, transformer.categories_):
+                cat_cols.append(col)
+                cat_lookup.append({cat: offset + k for k, cat in enumerate(categories.tolist())})
+                cat_strict.append(transformer.handle_unknown == 'error')
+                offset += len(categories)
+        else:
+            raise ValueError(f"Unsupported transformer '{name}': {type(transformer).__name__}")
+
+    n_features = len(preprocessor.get_feature_names_out())
+    if offset != n_features:
+        raise ValueError(f"Encoder layout has {offset} columns, preprocessor outputs {n_features}")
+
+    return {
+        'num_cols': num_cols,
+        'num_slots': np.array(num_slots, dtype=np.intp),
+        'mean': np.array(means, dtype=np.float64),
+        'scale': np.array(scales, dtype=np.float64),
+        'cat_cols': cat_cols,
+        'cat_lookup': cat_lookup,
+        'cat_strict': cat_strict,
+        'n_features': n_features,
+    }
+
+def _encode_kernel(nums_in, means, scales, num_slots, cat_ids, out):
+    """Scale numerics and set one-hot slots for each row of a preallocated output"""
+    for i in range(nums_in.shape[0]):
+        for k in range(out.shape[1]):
+            out[i, k] = 0.0
+        for j in range(nums_in.shape[1]):
+            out[i, num_slots[j]] = (nums_in[i, j] - means[j]) / scales[j]
+        for j in range(cat_ids.shape[1]):
+            if cat_ids[i, j] >= 0:
+                out[i, cat_ids[i, j]] = 1.0
+
+encode_kernel = njit(cache=True, fastmath=True)(_encode_kernel) if njit is not None else None
+
+def _resolve_rows(rows):
+    """Split request dicts into a numeric matrix and resolved one-hot slot indices"""
+    enc = feature_encoder
+    try:
+        nums = np.array([[row[col] for col in enc['num_cols']] for row in rows], dtype=np.float64)
+        cat_ids = np.empty((len(rows), len(enc['cat_cols'])), dtype=np.intp)
+        for i, row in enumerate(rows):
+            for j, (col, lookup, strict) in enumerate(zip(enc['cat_cols'], enc['cat_lookup'], enc['cat_strict'])):
+                slot = lookup.get(row[col], -1)
+                if slot < 0 and strict:
+                    raise ValueError(f"Found unknown category {row[col]!r} in column '{col}'")
+                cat_ids[i, j] = slot
+    except KeyError as e:
+        raise ValueError(f"Missing feature: {e.args[0]}") from e
+    return nums, cat_ids
+
+def _encode_arrays(nums, cat_ids, out=None):
+    """Assemble the preprocessed float32 feature matrix from resolved inputs"""
+    enc = feature_encoder
+    x = np.empty((nums.shape[0], enc['n_features']), dtype=np.float32) if out is None else out
+    if encode_kernel is not None:
+        encode_kernel(nums, enc['mean'], enc['scale'], enc['num_slots'], cat_ids, x)
+        return x
+    x[:] = 0.0
+    x[:, enc['num_slots']] = (nums - enc['mean']) / enc['scale']
+    rows_idx, cols_idx = np.nonzero(cat_ids >= 0)
+    x[rows_idx, cat_ids[rows_idx, cols_idx]] = 1.0
+    return x
+
+def load_feature_encoder(path):
+    """Build the feature encoder from the preprocessing arrays saved at training time"""
+    with np.load(path, allow_pickle=False) as pre:
+        num_cols = pre['num_cols'].tolist()
+        cat_cols = pre['cat_cols'].tolist()
+        categories = [pre[f'cats_{i}'].tolist() for i in range(len(cat_cols))]
+        feature_names_out = pre['feature_names_out'].tolist()
+        mean = pre['mean'].astype(np.float64)
+        scale = pre['scale'].astype(np.float64)
+        # Files written before handle_unknown was saved came from an 'ignore' encoder
+        handle_unknown = str(pre['handle_unknown']) if 'handle_unknown' in pre.files else 'ignore'
+
+    # Same layout as the training ColumnTransformer: scaled numerics, then one-hot blocks
+    expected_names = [f"num__{col}" for col in num_cols] + [
+        f"cat__{col}_{cat}" for col, cats in zip(cat_cols, categories) for cat in cats
+    ]
+    if expected_names != feature_names_out:
+        raise ValueError(f"Feature layout in {path} does not match the saved feature names")
+
+    cat_lookup = []
+    offset = len(num_cols)
+    for cats in categories:
+        cat_lookup.append({cat: offset + k for k, cat in enumerate(cats)})
+        offset += len(cats)
+
+    return {
+        'num_cols': num_cols,
+        'num_slots': np.arange(len(num_cols), dtype=np.intp),
+        'mean': mean,
+        'scale': scale,
+        'cat_cols': cat_cols,
+        'cat_lookup': cat_lookup,
+        'cat_strict': [handle_unknown == 'error'] * len(cat_cols),
+        'n_features': len(feature_names_out),
+    }
+
+def encode_rows(rows, out=None):
+    """Build the preprocessed float32 feature matrix directly from request dicts"""
+    nums, cat_ids = _resolve_rows(rows)
+    return _encode_arrays(nums, cat_ids, out)
+
+def _build_frame(rows):
+    """Build the preprocessor's input DataFrame with fixed column order and dtypes"""
+    if input_columns is None:
+        return pd.DataFrame(rows)
+    try:
+        df = pd.DataFrame({col: [row[col] for row in rows] for col in input_columns})
+    except KeyError as e:
+        raise ValueError(f"Missing feature: {e.args[0]}") from e
+    if input_dtypes is not None:
+        df = df.astype(input_dtypes)
+    return df
+
+def _preprocess(rows, out=None):
+    """Transform raw request dicts into model input, optionally into a preallocated buffer"""
+    if feature_encoder is not None:
+        return encode_rows(rows, out)
+    # Skip sklearn's NaN/Inf scan of the input. sklearn config is thread-local,
+    # so it is applied here in the scoring thread rather than once at startup
+    with sklearn.config_context(assume_finite=True):
+        return preprocessor.transform(_build_frame(rows))
+
+def _predict_trees_kernel(X, feat, thresh, yes, no, missing, leaf, roots, depth, base_margin, out):
+    """Walk every tree for each row over flat node arrays and apply the sigmoid"""
+    one = np.float32(1.0)
+    for r in range(X.shape[0]):
+        margin = np.float32(base_margin)
+        for t in range(roots.shape[0]):
+            node = roots[t]
+            # Leaves point to themselves, so a fixed number of steps reaches every leaf
+            for _ in range(depth):
+                x = X[r, feat[node]]
+                if np.isnan(x):
+                    node = missing[node]
+                else:
+                    node = yes[node] if x < thresh[node] else no[node]
+            margin += leaf[node]
+        out[r] = one / (one + np.exp(-margin))
+
+tree_kernel = njit(cache=True)(_predict_trees_kernel) if njit is not None else None
+
+def build_tree_model(booster, iteration_range):
+    """Flatten the Booster's trees into contiguous node arrays and verify them against XGBoost"""
+    config = json.loads(booster.save_config())
+    objective = config['learner']['objective']['name']
+    if objective != 'binary:logistic':
+        raise ValueError(f"Unsupported objective: {objective}")
+    base_score = float(config['learner']['learner_model_param']['base_score'].strip('[]'))
+    base_margin = np.float32(np.log(base_score / (1.0 - base_score)))
+
+    df = booster.trees_to_dataframe()
+    if 'Category' in df and df['Category'].notna().any():
+        raise ValueError("Categorical splits are not supported")
+    n_rounds = iteration_range[1] or booster.num_boosted_rounds()
+    trees_per_round = (df['Tree'].max() + 1) // booster.num_boosted_rounds()
+    df = df[df['Tree'] < n_rounds * trees_per_round]
+
+    # Global node index = tree offset + node id within the tree
+    tree_sizes = df.groupby('Tree')['Node'].max().to_numpy() + 1
+    offsets = np.concatenate(([0], np.cumsum(tree_sizes)[:-1]))
+    n_nodes = int(tree_sizes.sum())
+    index = offsets[df['Tree'].to_numpy()] + df['Node'].to_numpy()
+
+    feat = np.zeros(n_nodes, dtype=np.int32)
+    thresh = np.zeros(n_nodes, dtype=np.float32)
+    yes = np.arange(n_nodes, dtype=np.int32)
+    no = np.arange(n_nodes, dtype=np.int32)
+    missing = np.arange(n_nodes, dtype=np.int32)
+    leaf = np.zeros(n_nodes, dtype=np.float32)
+
+    is_leaf = (df['Feature'] == 'Leaf').to_numpy()
+    leaf[index[is_leaf]] = df['Gain'].to_numpy()[is_leaf]
+    splits = df[~is_leaf]
+    split_index = index[~is_leaf]
+    split_offsets = offsets[splits['Tree'].to_numpy()]
+    names = booster.feature_names
+    feat[split_index] = [
+        names.index(f) if names else int(f[1:]) for f in splits['Feature']
+    ]
+    thresh[split_index] = splits['Split'].to_numpy()
+    for child, column in ((yes, 'Yes'), (no, 'No'), (missing, 'Missing')):
+        child[split_index] = split_offsets + splits[column].str.split('-').str[1].astype(int).to_numpy()
+
+    # Children always have larger ids than their parent, so one ordered pass finds the depth
+    node_depth = np.zeros(n_nodes, dtype=np.int32)
+    for i in np.sort(split_index):
+        node_depth[yes[i]] = node_depth[no[i]] = node_depth[i] + 1
+
+    model = {
+        'feat': feat,
+        'thresh': thresh,
+        'yes': yes,
+        'no': no,
+        'missing': missing,
+        'leaf': leaf,
+        'roots': offsets.astype(np.int32),
+        'depth': int(node_depth.max()),
+        'base_margin': base_margin,
+        'n_features': booster.num_features(),
+    }
+
+    # Refuse to serve from the kernel unless it matches XGBoost on random inputs
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=(256, booster.num_features())).astype(np.float32)
+    x[rng.random(x.shape) < 0.05] = np.nan
+    expected = booster.inplace_predict(x, iteration_range=iteration_range)
+    actual = predict_trees(model, x)
+    if not np.allclose(actual, expected, rtol=0, atol=1e-6):
+        raise ValueError(f"Kernel output differs from XGBoost by up to {np.nanmax(np.abs(actual - expected)):.2e}")
+    return model
+
+def predict_trees(model, x, out=None):
+    """Probabilities for a contiguous float32 matrix using the flattened trees"""
+    # The kernel indexes columns unchecked; reject the widths inplace_predict would
+    if x.ndim != 2 or x.shape[1] != model['n_features']:
+        raise ValueError(f"Feature shape mismatch, expected: {model['n_features']}, got {x.shape[-1]}")
+    if out is None:
+        out = np.empty(x.shape[0], dtype=np.float32)
+    tree_kernel(
+        x, model['feat'], model['thresh'], model['yes'], model['no'], model['missing'],
+        model['leaf'], model['roots'], model['depth'], model['base_margin'], out
+    )
+    return out
+
+def _predict_proba(processed_data, out=None):
+    """Return the default probability for each preprocessed row"""
+    if hasattr(processed_data, 'toarray'):
+        processed_data = processed_data.toarray()
+    # Contiguous float32 input is predicted in place, without a DMatrix or copy
+    x = np.ascontiguousarray(processed_data, dtype=np.float32)
+    if tree_model is not None and x.shape[0] <= TREE_KERNEL_MAX_ROWS:
+        return predict_trees(tree_model, x, out)
+    return np.asarray(booster.inplace_predict(x, iteration_range=iteration_range)).ravel()
+
+def _run_batch(batch, x_buf=None, out_buf=None):
+    """Preprocess and score a list of queued requests in a single pass"""
+    rows = [row for row, _, _ in batch]
+    k = len(batch)
+    try:
+        processed_data = _preprocess(rows, None if x_buf is None else x_buf[:k])
+    except Exception as e:
+        if len(batch) > 1:
+            # Score requests one by one so a single bad row does not fail the others
+            for item in batch:
+                _run_batch([item], x_buf, out_buf)
+            return
+        logger.error("Preprocessing error: %s", e)
+        batch[0][2].update(error=f'Data preprocessing failed: {str(e)}', status=400)
+        return
+
+    try:
+        probs = _predict_proba(processed_data, None if out_buf is None else out_buf[:k])
+    except Exception as e:
+        logger.error("Prediction error: %s", e)
+        for _, _, result in batch:
+            result.update(error=f'Prediction failed: {str(e)}', status=500)
+        return
+
+    for (_, _, result), prob in zip(batch, probs):
+        result['probability'] = float(prob)
+
+def _batch_worker_loop():
+    """Drain the request queue and score requests in micro-batches"""
+    timeout = BATCH_TIMEOUT_MS / 1000.0
+    # Input and output buffers reused by every batch this thread scores
+    x_buf = out_buf = None
+    while True:
+        item = batch_queue.get()
+        # Callers that already gave up with a 503 are not worth scoring
+        if item[2].get('abandoned'):
+            continue
+        batch = [item]
+        # Nagle-style: a request that arrives alone is scored right away. The
+        # window only opens when others queued up while the last batch was scored
+        deadline = time.monotonic() + timeout if not batch_queue.empty() else 0
+        while len(batch) < MAX_BATCH:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = batch_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if not item[2].get('abandoned'):
+                batch.append(item)
+        try:
+            if x_buf is None or x_buf.shape[1] != n_model_features:
+                x_buf = np.empty((MAX_BATCH, n_model_features), dtype=np.float32)
+                out_buf = np.empty(MAX_BATCH, dtype=np.float32)
+            _run_batch(batch, x_buf, out_buf)
+        except Exception as e:
+            logger.error("Batch worker error: %s", e)
+            for _, _, result in batch:
+                if 'probability' not in result and 'error' not in result:
+                    result.update(error=f'Prediction failed: {str(e)}', status=500)
+        finally:
+            for _, done, _ in batch:
+                done.set()
+
+def batch_worker_alive():
+    """Whether this process has a running micro-batching thread"""
+    return batch_worker is not None and batch_worker_pid == os.getpid() and batch_worker.is_alive()
+
+def start_batch_worker():
+    """Start the background micro-batching thread if this process has no live one"""
+    global batch_queue, batch_worker, batch_worker_pid
+    with batch_worker_lock:
+        if batch_worker_alive():
+            return
+        if batch_worker_pid != os.getpid():
+            # A forked process gets a fresh queue rather than its parent's
+            batch_queue = queue.Queue()
+        batch_worker = threading.Thread(target=_batch_worker_loop, name='batch-worker', daemon=True)
+        batch_worker_pid = os.getpid()
+        batch_worker.start()
+    logger.info("Batch worker started (MAX_BATCH=%d, BATCH_TIMEOUT_MS=%s)", MAX_BATCH, BATCH_TIMEOUT_MS)
+
+def _start_batch_worker_after_fork():
+    """Give every forked child (e.g. preloaded gunicorn/uWSGI workers) its own batch thread"""
+    global batch_worker_lock
+    # The parent's lock may have been held by another thread at fork time
+    batch_worker_lock = threading.Lock()
+    if booster is not None:
+        start_batch_worker()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_start_batch_worker_after_fork)
+
+def submit_prediction(data):
+    """Queue one request for the batch worker and wait for its result"""
+    # Started lazily so any server layout (threaded, forked, preloaded) gets one
+    if not batch_worker_alive():
+        start_batch_worker()
+    done = threading.Event()
+    result = {}
+    batch_queue.put((data, done, result))
+    if not done.wait((BATCH_TIMEOUT_MS + SCORING_TIMEOUT_MS) / 1000.0):
+        # Tell the worker to drop this entry if it hasn't dequeued it yet
+        result['abandoned'] = True
+        logger.error("Prediction timed out waiting for the batch worker")
+        return {'error': 'Prediction timed out. Please retry shortly.', 'status': 503}
+    return result
+
+class PredictionError(Exception):
+    """Scoring failure reported back to the client with an HTTP status"""
+
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+def _score(data):
+    """Score one request through the batch worker, raising PredictionError on failure"""
+    result = submit_prediction(data)
+    if 'error' in result:
+        raise PredictionError(result['error'], result['status'])
+    return result['probability']
+
+def round_features(data):
+    """Copy of an applicant with floats rounded to 4 decimals, the precision every endpoint scores at"""
+    return {key: round(value, 4) if isinstance(value, float) else value for key, value in data.items()}
+
+def _canonicalize(data):
+    """Order-independent cache key for an applicant already passed through round_features"""
+    return tuple(sorted(data.items()))
+
+@functools.lru_cache(maxsize=PREDICTION_CACHE_SIZE)
+def _cached_probability(key):
+    """Memoized probability for a canonical feature tuple (errors are not cached)"""
+    return _score(dict(key))
+
+def predict_probability(data):
+    """Default probability for one request, served from the LRU cache when possible"""
+    try:
+        key = _canonicalize(data)
+        hash(key)
+    except (AttributeError, TypeError):
+        # Non-dict payloads or unhashable values can't be cached
+        return _score(data)
+    return _cached_probability(key)
+
+def json_response(obj, status=200):
+    """Serialize a response body with orjson"""
+    return Response(orjson.dumps(obj), status=status, mimetype='application/json')
+
+# Rationale rules, evaluated as two vector compares over the whole batch: a
+# feature above its high threshold or below its low threshold adds that message
+RATIONALE_FEATURES = ('loan_percent_income', 'loan_int_rate', 'cb_person_cred_hist_length')
+RATIONALE_HIGH = np.array([0.6, 20.0, 8.0, 0.5])
+RATIONALE_LOW = np.array([0.2, 8.0, 2.0, -np.inf])
+RATIONALE_HIGH_MSGS = np.array([
+    "High loan-to-income ratio",
+    "Very high interest rate",
+    "Established credit history",
+    "Previous default on file",
+], dtype=object)
+RATIONALE_LOW_MSGS = np.array([
+    "Low loan-to-income ratio",
+    "Favorable interest rate",
+    "Short credit history",
+    "",
+], dtype=object)
+
+def build_rationales(rows):
+    """Rule-based rationales for a list of applicants (for demo)"""
+    values = np.full((len(rows), len(RATIONALE_HIGH)), np.nan)
+    unavailable = np.zeros(len(rows), dtype=bool)
+    for i, data in enumerate(rows):
+        try:
+            values[i] = [float(data.get(col)) for col in RATIONALE_FEATURES] + [data.get('cb_person_default_on_file') == 'Y']
+        except Exception:
+            unavailable[i] = True
+    parts = np.where(values > RATIONALE_HIGH, RATIONALE_HIGH_MSGS,
+                     np.where(values < RATIONALE_LOW, RATIONALE_LOW_MSGS, ""))
+    return [
+        "Rationale unavailable" if skip
+        else ", ".join(part for part in row if part) or "Typical risk profile for provided features"
+        for row, skip in zip(parts, unavailable)
+    ]
+
+def build_rationale(data):
+    """Simple rule-based rationale based on key drivers (for demo)"""
+    return build_rationales([data])[0]
+
+def build_response(probability, prediction, data, rationale=None):
+    """Assemble the response body for one scored applicant"""
+    if prediction == 0:
+        message = f"Low Risk: This loan application has a {probability:.2%} probability of default. Recommended for approval."
+    else:
+        message = f"High Risk: This loan application has a {probability:.2%} probability of default. Not recommended for approval."
+
+    return {
+        'prediction': int(prediction),
+        'probability': float(probability),
+        'message': message,
+        'risk_level': 'High Risk' if prediction == 1 else 'Low Risk',
+        'rationale': build_rationale(data) if rationale is None else rationale
+    }
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({
-        'status': 'healthy',
-        'model_loaded': model is not None,
-        'preprocessor_loaded': preprocessor is not None
-    })
+    # With models loaded, /predict can only answer if the batch thread is running
+    if booster is not None and not batch_worker_alive():
+        start_batch_worker()
+    worker_alive = batch_worker_alive()
+    stalled = booster is not None and not worker_alive
+    return json_response({
+        'status': 'unhealthy' if stalled else 'healthy',
+        'model_loaded': booster is not None,
+        'preprocessor_loaded': feature_encoder is not None or preprocessor is not None,
+        'batch_worker_alive': worker_alive
+    }, 503 if stalled else 200)
 
 @app.route('/predict', methods=['POST'])
 def predict():
     """Main prediction endpoint"""
     try:
         # Check if models are loaded
-        if model is None or preprocessor is None:
-            return jsonify({
+        if booster is None or (feature_encoder is None and preprocessor is None):
+            return json_response({
                 'error': 'Models not loaded. Please ensure model files are available.'
-            }), 500
+            }, 500)
         
         # Get JSON data from request
-        data = request.get_json()
+        raw = request.get_data()
+        if not raw:
+            return json_response({'error': 'No data provided'}, 400)
+        try:
+            data = orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            return json_response({'error': 'Invalid JSON payload'}, 400)
         if not data:
-            return jsonify({'error': 'No data provided'}), 400
+            return json_response({'error': 'No data provided'}, 400)
+        # Score, cache and explain the same rounded values /predict_batch uses
+        if isinstance(data, dict):
+            data = round_features(data)
+        
+        # Log the input data (formatting the dict is only worth it when debugging)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Received prediction request with data: %s", data)
         
-        # Convert to DataFrame
-        df = pd.DataFrame([data])
+        # Look the request up in the cache, else score it together with any concurrent ones
+        try:
+            probability = predict_probability(data)
+        except PredictionError as e:
+            return json_response({'error': e.message}, e.status)
         
-        # Log the input data
-        logger.info(f"Received prediction request with data: {data}")
+        prediction = int(1 if probability >= 0.5 else 0)
+        logger.info("Prediction: %s, Probability: %.4f", prediction, probability)
         
-        # Preprocess the data
+        # Return prediction results
+        return json_response(build_response(probability, prediction, data))
+        
+    except Exception as e:
+        logger.error("Unexpected error in prediction endpoint: %s", e)
+        return json_response({
+            'error': f'An unexpected error occurred: {str(e)}'
+        }, 500)
+
+@app.route('/predict_batch', methods=['POST'])
+def predict_batch():
+    """Batch prediction endpoint: scores a JSON list of applicants in one pass"""
+    try:
+        # Check if models are loaded
+        if booster is None or (feature_encoder is None and preprocessor is None):
+            return json_response({
+                'error': 'Models not loaded. Please ensure model files are available.'
+            }, 500)
+
+        # Get JSON list from request
+        raw = request.get_data()
+        if not raw:
+            return json_response({'error': 'No data provided'}, 400)
         try:
-            processed_data = preprocessor.transform(df)
-            logger.info("Data preprocessing completed successfully")
+            rows = orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            return json_response({'error': 'Invalid JSON payload'}, 400)
+        if not isinstance(rows, list) or not rows or not all(isinstance(row, dict) for row in rows):
+            return json_response({'error': 'Expected a non-empty JSON list of applicant objects'}, 400)
+        rows = [round_features(row) for row in rows]
+
+        logger.info("Received batch prediction request with %d rows", len(rows))
+
+        # Preprocess all rows into one feature matrix
+        try:
+            processed_data = _preprocess(rows)
         except Exception as e:
-            logger.error(f"Preprocessing error: {str(e)}")
-            return jsonify({
+            logger.error("Preprocessing error: %s", e)
+            return json_response({
                 'error': f'Data preprocessing failed: {str(e)}'
-            }), 400
-        
-        # Make prediction
+            }, 400)
+
+        # Score the whole matrix with a single predictor call
         try:
-            # Use Booster directly to avoid compatibility issues (gpu_id/use_label_encoder)
-            booster = model.get_booster() if hasattr(model, 'get_booster') else None
-            if booster is not None:
-                dmatrix = xgb.DMatrix(processed_data)
-                prob = booster.predict(dmatrix)
-                # Handle output shape for binary classification
-                if isinstance(prob, (list, tuple)):
-                    prob = np.array(prob)
-                prob = prob.ravel()[0]
-                probability = float(prob)
-                prediction = int(1 if probability >= 0.5 else 0)
-            else:
-                # Fallback to sklearn wrapper
-                prediction = model.predict(processed_data)[0]
-                probability = float(model.predict_proba(processed_data)[0][1])
-            logger.info(f"Prediction: {prediction}, Probability: {probability:.4f}")
+            probs = _predict_proba(processed_data)
         except Exception as e:
-            logger.error(f"Prediction error: {str(e)}")
-            return jsonify({
+            logger.error("Prediction error: %s", e)
+            return json_response({
                 'error': f'Prediction failed: {str(e)}'
-            }), 500
-        
-        # Create response message and lightweight rationale
-        if prediction == 0:
-            message = f"Low Risk: This loan application has a {probability:.2%} probability of default. Recommended for approval."
-        else:
-            message = f"High Risk: This loan application has a {probability:.2%} probability of default. Not recommended for approval."
+            }, 500)
+        preds = (probs >= 0.5).astype(np.int8)
+        rationales = build_rationales(rows)
+
+        return json_response({
+            'predictions': [
+                build_response(float(prob), int(pred), row, rationale)
+                for prob, pred, row, rationale in zip(probs, preds, rows, rationales)
+            ]
+        })
 
-        # Simple rule-based rationale based on key drivers (for demo)
-        rationale_parts = []
-        try:
-            loan_percent_income = float(df.get('loan_percent_income', [None])[0])
-            if loan_percent_income is not None:
-                if loan_percent_income > 0.6:
-                    rationale_parts.append("High loan-to-income ratio")
-                elif loan_percent_income < 0.2:
-                    rationale_parts.append("Low loan-to-income ratio")
-            loan_int_rate = float(df.get('loan_int_rate', [None])[0])
-            if loan_int_rate is not None:
-                if loan_int_rate > 20:
-                    rationale_parts.append("Very high interest rate")
-                elif loan_int_rate < 8:
-                    rationale_parts.append("Favorable interest rate")
-            cred_hist = float(df.get('cb_person_cred_hist_length', [None])[0])
-            if cred_hist is not None:
-                if cred_hist < 2:
-                    rationale_parts.append("Short credit history")
-                elif cred_hist > 8:
-                    rationale_parts.append("Established credit history")
-            previous_default = df.get('cb_person_default_on_file', [None])[0]
-            if previous_default == 'Y':
-                rationale_parts.append("Previous default on file")
-            if not rationale_parts:
-                rationale_parts.append("Typical risk profile for provided features")
-        except Exception:
-            rationale_parts = ["Rationale unavailable"]
-        rationale = ", ".join(rationale_parts)
-        
-        # Return prediction results
-        response = {
-            'prediction': int(prediction),
-            'probability': float(probability),
-            'message': message,
-            'risk_level': 'High Risk' if prediction == 1 else 'Low Risk',
-            'rationale': rationale
-        }
-        
-        return jsonify(response)
-        
     except Exception as e:
-        logger.error(f"Unexpected error in prediction endpoint: {str(e)}")
-        return jsonify({
+        logger.error("Unexpected error in batch prediction endpoint: %s", e)
+        return json_response({
             'error': f'An unexpected error occurred: {str(e)}'
-        }), 500
+        }, 500)
 
 @app.route('/', methods=['GET'])
 def index():
     """Root endpoint with API information"""
-    return jsonify({
+    return json_response({
         'message': 'Credit Risk Assessment API',
         'endpoints': {
             'GET /': 'API information',
             'GET /health': 'Health check',
-            'POST /predict': 'Make credit risk prediction'
+            'POST /predict': 'Make credit risk prediction',
+            'POST /predict_batch': 'Make credit risk predictions for a list of applicants'
         },
         'usage': 'Send POST request to /predict with loan applicant features'
     })
 
-if __name__ == '__main__':
-    # Load models on startup
+def run_server():
+    """Load models and serve with Flask's built-in server (use gunicorn in production)"""
     logger.info("Starting Credit Risk Assessment API...")
-    if load_models():
-        logger.info("All models loaded successfully. Starting Flask server...")
-        app.run(debug=True, host='0.0.0.0', port=5001)
-    else:
+    if not load_models():
         logger.error("Failed to load models. Please check model files and restart.")
+        return False
+    logger.info("All models loaded successfully. Starting Flask server...")
+    start_batch_worker()
+    # No debugger or reloader thread competing with the predictor. Requests stay
+    # threaded so concurrent /predict calls can share a micro-batch
+    app.run(debug=False, use_reloader=False, threaded=True, host='0.0.0.0', port=5001)
+    return True
+
+if __name__ == '__main__':
+    if not run_server():
         exit(1)
@@ -0,0 +1,24 @@
+"""
+Gunicorn configuration for the Credit Risk Assessment API.
+Usage: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import gc
+import multiprocessing
+import os
+
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', '5001')}"
+
+# One prefork worker per core; each Booster predicts with nthread=1
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+
+# A few threads per worker so concurrent requests can share a micro-batch
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Load models once in the master process before forking workers
+preload_app = True
+
+def pre_fork(server, worker):
+    """Freeze preloaded objects so worker GC passes don't unshare their pages"""
+    gc.freeze()
@@ -1,58 +1,74 @@
 #!/usr/bin/env python3
-import joblib
-import pandas as pd
+import json
 import os
 
+def load_legacy_meta(model_dir):
+    """Build the model_meta.json fields from preprocessor.joblib and final_xgb_model.joblib"""
+    import joblib
+    preprocessor = joblib.load(os.path.join(model_dir, 'preprocessor.joblib'))
+    model = joblib.load(os.path.join(model_dir, 'final_xgb_model.joblib'))
+    booster = model.get_booster()
+    num_cols, cat_cols = [], []
+    scaler = encoder = None
+    for name, step, cols in preprocessor.transformers_:
+        if name == 'num':
+            num_cols, scaler = list(cols), step
+        elif name == 'cat':
+            cat_cols, encoder = list(cols), step
+    best_iteration = getattr(model, 'best_iteration', None)
+    return {
+        'numerical': num_cols,
+        'categorical': cat_cols,
+        'scaler_mean': scaler.mean_.tolist(),
+        'scaler_scale': scaler.scale_.tolist(),
+        'categories': {col: cats.tolist() for col, cats in zip(cat_cols, encoder.categories_)},
+        'feature_names_out': preprocessor.get_feature_names_out().tolist(),
+        'num_boosted_rounds': booster.num_boosted_rounds(),
+        'best_iteration': best_iteration,
+    }
+
 try:
     # Resolve model directory relative to this file
     base_dir = os.path.dirname(os.path.abspath(__file__))
-    model_dir = os.path.join(base_dir, 'model')
+    meta_path = os.path.join(base_dir, 'model', 'model_meta.json')
+
+    # Load the metadata written at training time (no unpickling needed);
+    # artifacts from older training runs only have the joblib files
+    print("Loading model metadata...")
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        print("✅ Model metadata loaded successfully")
+    else:
+        print(f"⚠️  {meta_path} not found, reading the joblib artifacts instead")
+        meta = load_legacy_meta(os.path.join(base_dir, 'model'))
+        print("✅ Preprocessor and XGBoost model loaded successfully")
 
-    # Load the preprocessor
-    print("Loading preprocessor...")
-    preprocessor = joblib.load(os.path.join(model_dir, 'preprocessor.joblib'))
-    print("✅ Preprocessor loaded successfully")
-    
-    # Load the model
-    print("Loading XGBoost model...")
-    model = joblib.load(os.path.join(model_dir, 'final_xgb_model.joblib'))
-    print("✅ XGBoost model loaded successfully")
-    
     # Check preprocessor structure
     print("\n🔍 PREPROCESSOR ANALYSIS:")
-    if hasattr(preprocessor, 'steps'):
-        for i, (name, step) in enumerate(preprocessor.steps):
-            print(f"Step {i+1}: {name} - {type(step).__name__}")
-            if hasattr(step, 'categories_'):
-                print(f"  Categories: {step.categories_}")
-            if hasattr(step, 'feature_names_in_'):
-                print(f"  Feature names: {step.feature_names_in_}")
-    
+    print("Step 1: num - StandardScaler")
+    for col, mean, scale in zip(meta['numerical'], meta['scaler_mean'], meta['scaler_scale']):
+        print(f"  {col}: mean={mean:.4f}, scale={scale:.4f}")
+    print("Step 2: cat - OneHotEncoder")
+    for col in meta['categorical']:
+        print(f"  {col}: {meta['categories'][col]}")
+
     # Check model attributes
     print("\n🔍 MODEL ANALYSIS:")
-    print(f"Model type: {type(model).__name__}")
-    if hasattr(model, 'feature_names_in_'):
-        print(f"Feature names: {model.feature_names_in_}")
-    if hasattr(model, 'use_label_encoder'):
-        print(f"Has use_label_encoder: {hasattr(model, 'use_label_encoder')}")
-    
-    # Try to get feature names from preprocessor
-    if hasattr(preprocessor, 'get_feature_names_out'):
-        try:
-            feature_names = preprocessor.get_feature_names_out()
-            print(f"\n📋 EXPECTED FEATURES ({len(feature_names)}):")
-            for i, name in enumerate(feature_names):
-                print(f"  {i+1:2d}. {name}")
-        except Exception as e:
-            print(f"Could not get feature names: {e}")
-    
+    print(f"Boosting rounds: {meta['num_boosted_rounds']}")
+    print(f"Best iteration: {meta['best_iteration']}")
+
+    # Expected model input features
+    feature_names = meta['feature_names_out']
+    print(f"\n📋 EXPECTED FEATURES ({len(feature_names)}):")
+    for i, name in enumerate(feature_names):
+        print(f"  {i+1:2d}. {name}")
+
     # Check what the preprocessor expects as input
     print("\n🔍 INPUT EXPECTATIONS:")
-    if hasattr(preprocessor, 'steps'):
-        for name, step in preprocessor.steps:
-            if hasattr(step, 'feature_names_in_'):
-                print(f"{name} expects: {step.feature_names_in_}")
-    
+    print(f"num expects: {meta['numerical']}")
+    print(f"cat expects: {meta['categorical']}")
+
 except Exception as e:
     print(f"❌ Error: {e}")
     import traceback
@@ -34,18 +34,24 @@ def check_dependencies():
 
 def check_model_files():
     """Check if model files exist"""
-    required_files = ['preprocessor.joblib', 'final_xgb_model.joblib']
+    # Same files app.load_models() resolves: current artifact first, then the legacy one
+    model_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model')
+    required_files = [
+        ('pre.npz', 'preprocessor.joblib'),
+        ('xgb.ubj', 'final_xgb_model.joblib'),
+    ]
     missing_files = []
     
-    for file in required_files:
-        if not os.path.exists(file):
-            missing_files.append(file)
+    for candidates in required_files:
+        if not any(os.path.exists(os.path.join(model_dir, file)) for file in candidates):
+            missing_files.append(' or '.join(candidates))
     
     if missing_files:
         print("❌ Missing model files:")
         for file in missing_files:
             print(f"   - {file}")
-        print("\nPlease ensure these files are in the current directory.")
+        print(f"\nPlease ensure these files are in {model_dir}")
+        print("or run: python train_with_mlflow.py")
         return False
     
     print("✅ All model files found")
@@ -58,7 +64,7 @@ def start_flask_app():
     
     try:
         # Start the Flask app
-        from app import app
+        from app import run_server
         
         print("✅ Flask application loaded successfully")
         print("🌐 Server will be available at: http://localhost:5001")
@@ -66,8 +72,9 @@ def start_flask_app():
         print("\nPress Ctrl+C to stop the server")
         print("=" * 50)
         
-        # Run the app
-        app.run(debug=True, host='0.0.0.0', port=5000)
+        # Load the models and run the same server as `python app.py`
+        if not run_server():
+            return False
         
     except Exception as e:
         print(f"❌ Failed to start Flask application: {e}")
@@ -59,5 +59,9 @@ echo "Press Ctrl+C to stop the server"
 echo "================================================"
 echo
 
-# Start the Flask application
-python3 app.py
+# Start the application behind gunicorn when available, else Flask's server
+if python3 -c "import gunicorn" &> /dev/null; then
+    gunicorn -c gunicorn.conf.py wsgi:app
+else
+    python3 app.py
+fi
@@ -86,10 +86,10 @@ CAT_COLS = [
 def build_preprocessor() -> ColumnTransformer:
     return ColumnTransformer(
         transformers=[
-            ("num", StandardScaler(with_mean=True, with_std=True), NUM_COLS),
+            ("num", StandardScaler(with_mean=True, with_std=True, copy=False), NUM_COLS),
             (
                 "cat",
-                OneHotEncoder(handle_unknown="ignore", sparse_output=False),
+                OneHotEncoder(handle_unknown="ignore", sparse_output=False, dtype=np.float32),
                 CAT_COLS,
             ),
         ],
@@ -103,6 +103,11 @@ def main() -> None:
     X_train, X_test, y_train, y_test = train_test_split(
         df, y, test_size=0.2, random_state=SEED, stratify=y
     )
+    # Early stopping picks the tree count on a validation split, so the test
+    # set stays unseen for the reported metrics
+    X_train, X_val, y_train, y_val = train_test_split(
+        X_train, y_train, test_size=0.2, random_state=SEED, stratify=y_train
+    )
 
     preprocessor = build_preprocessor()
     model = XGBClassifier(
@@ -112,6 +117,8 @@ def main() -> None:
         subsample=0.9,
         colsample_bytree=0.9,
         tree_method="hist",
+        max_bin=128,
+        early_stopping_rounds=20,
         random_state=SEED,
         n_jobs=4,
     )
@@ -125,16 +132,20 @@ def main() -> None:
                 "subsample": model.subsample,
                 "colsample_bytree": model.colsample_bytree,
                 "tree_method": model.tree_method,
+                "max_bin": model.max_bin,
+                "early_stopping_rounds": model.early_stopping_rounds,
                 "seed": SEED,
             }
         )
 
         # Fit preprocessor and transform data
         X_train_proc = preprocessor.fit_transform(X_train)
+        X_val_proc = preprocessor.transform(X_val)
         X_test_proc = preprocessor.transform(X_test)
 
-        # Fit model on processed features
-        model.fit(X_train_proc, y_train)
+        # Fit model on processed features, stopping once the validation loss plateaus
+        model.fit(X_train_proc, y_train, eval_set=[(X_val_proc, y_val)], verbose=False)
+        best_iteration = model.best_iteration
 
         y_prob = model.predict_proba(X_test_proc)[:, 1]
         y_pred = (y_prob >= 0.5).astype(int)
@@ -143,14 +154,35 @@ def main() -> None:
         ap = average_precision_score(y_test, y_prob)
         f1 = f1_score(y_test, y_pred)
 
-        mlflow.log_metrics({"auc": auc, "ap": ap, "f1": f1})
+        mlflow.log_metrics({"auc": auc, "ap": ap, "f1": f1, "best_iteration": best_iteration})
 
         # Save artifacts for Flask app
         joblib.dump(preprocessor, ARTIFACT_DIR / "preprocessor.joblib")
-        joblib.dump(model, ARTIFACT_DIR / "final_xgb_model.joblib")
+        # The app only needs the fitted scaler/encoder arrays; a plain .npz loads
+        # without unpickling sklearn objects or matching the training sklearn version
+        scaler = preprocessor.named_transformers_["num"]
+        encoder = preprocessor.named_transformers_["cat"]
+        np.savez(
+            ARTIFACT_DIR / "pre.npz",
+            mean=scaler.mean_,
+            scale=scaler.scale_,
+            num_cols=np.array(NUM_COLS),
+            cat_cols=np.array(CAT_COLS),
+            feature_names_out=np.array(preprocessor.get_feature_names_out(), dtype=str),
+            handle_unknown=np.array(encoder.handle_unknown),
+            **{f"cats_{i}": np.array(cats, dtype=str) for i, cats in enumerate(encoder.categories_)},
+        )
+        # Persist the raw Booster: the app only needs predictions, and UBJSON
+        # loads across XGBoost versions without unpickling the sklearn wrapper
+        # best_iteration is stored on the Booster so the app can skip the trees
+        # grown after the early-stopping optimum
+        booster = model.get_booster()
+        booster.set_attr(best_iteration=str(best_iteration))
+        booster.save_model(str(ARTIFACT_DIR / "xgb.ubj"))
 
         mlflow.log_artifact(str(ARTIFACT_DIR / "preprocessor.joblib"), artifact_path="artifacts")
-        mlflow.log_artifact(str(ARTIFACT_DIR / "final_xgb_model.joblib"), artifact_path="artifacts")
+        mlflow.log_artifact(str(ARTIFACT_DIR / "pre.npz"), artifact_path="artifacts")
+        mlflow.log_artifact(str(ARTIFACT_DIR / "xgb.ubj"), artifact_path="artifacts")
 
         # Log the model (sklearn flavor) — wrap a dict with steps for reference
         mlflow.sklearn.log_model(model, artifact_path="model")
@@ -165,7 +197,25 @@ def main() -> None:
             json.dump(schema, f, indent=2)
         mlflow.log_artifact(str(schema_path), artifact_path="artifacts")
 
-        print(f"Logged run. AUC={auc:.4f}, AP={ap:.4f}, F1={f1:.4f}")
+        # Static model metadata, so tools can inspect it without unpickling artifacts
+        meta = {
+            "numerical": NUM_COLS,
+            "categorical": CAT_COLS,
+            "categories": {
+                col: encoder.categories_[i].tolist() for i, col in enumerate(CAT_COLS)
+            },
+            "scaler_mean": scaler.mean_.tolist(),
+            "scaler_scale": scaler.scale_.tolist(),
+            "feature_names_out": preprocessor.get_feature_names_out().tolist(),
+            "num_boosted_rounds": booster.num_boosted_rounds(),
+            "best_iteration": best_iteration,
+        }
+        meta_path = ARTIFACT_DIR / "model_meta.json"
+        with open(meta_path, "w") as f:
+            json.dump(meta, f, indent=2)
+        mlflow.log_artifact(str(meta_path), artifact_path="artifacts")
+
+        print(f"Logged run. AUC={auc:.4f}, AP={ap:.4f}, F1={f1:.4f}, best_iteration={best_iteration}")
         print(f"Artifacts saved to {ARTIFACT_DIR}/ and tracked in MLflow.")
 
 
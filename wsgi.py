@@ -0,0 +1,10 @@
+"""
+WSGI entrypoint for production servers.
+Models are loaded at import time so `gunicorn --preload` loads them once
+in the master process and workers inherit them copy-on-write.
+"""
+
+from app import app, load_models
+
+if not load_models():
+    raise RuntimeError("Failed to load models. Please check model files and restart.")